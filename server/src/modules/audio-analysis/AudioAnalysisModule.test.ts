@@ -1,6 +1,17 @@
 // Unit tests for Audio Analysis Module
 // Test scenarios based on design specifications
 
+import { encode, decode } from './msgpack';
+import { AudioAnalysisModule } from './AudioAnalysisModule';
+
+// Length-prefixed msgpack frame, as written by audio_emotion_analyzer.py
+const frame = (message: unknown): Buffer => {
+  const payload = Buffer.from(encode(message));
+  const header = Buffer.alloc(4);
+  header.writeUInt32LE(payload.length, 0);
+  return Buffer.concat([header, payload]);
+};
+
 describe('Module', () => {
   let audioAnalysisModule: any;
 
@@ -52,3 +63,136 @@ describe('Module', () => {
     });
   });
 });
+
+describe('AudioAnalysisModule Python framing', () => {
+  let module: any;
+
+  const expectResponse = (sessionId: string, timestamp: number) => {
+    const pending = {
+      resolve: jest.fn(),
+      reject: jest.fn(),
+      timer: setTimeout(() => {}, 5000),
+    };
+    module.pendingRequests.set(`${sessionId}:${timestamp}`, pending);
+    return pending;
+  };
+
+  const response = (sessionId: string, timestamp: number) => ({
+    result: { sessionId, timestamp, emotion: 'happy', confidence: 0.9 },
+    sessionId,
+    timestamp,
+  });
+
+  beforeEach(() => {
+    jest.useFakeTimers();
+    module = new AudioAnalysisModule();
+  });
+
+  afterEach(() => {
+    jest.useRealTimers();
+    jest.clearAllTimers();
+  });
+
+  it('should reassemble a frame split across chunks', () => {
+    const pending = expectResponse('s1', 1);
+    const data = frame(response('s1', 1));
+
+    module.handleStdoutData(data.subarray(0, 2));
+    module.handleStdoutData(data.subarray(2, 7));
+    expect(pending.resolve).not.toHaveBeenCalled();
+
+    module.handleStdoutData(data.subarray(7));
+    expect(pending.resolve).toHaveBeenCalledWith(response('s1', 1).result);
+    expect(module.pendingRequests.size).toBe(0);
+  });
+
+  it('should dispatch several frames from one chunk', () => {
+    const startup = { resolve: jest.fn(), reject: jest.fn() };
+    module.startup = startup;
+    const first = expectResponse('s1', 1);
+    const second = expectResponse('s2', 2);
+    const third = expectResponse('s3', 3);
+    const last = frame({ error: 'Analysis failed', sessionId: 's3', timestamp: 3 });
+
+    module.handleStdoutData(
+      Buffer.concat([
+        frame('READY'),
+        frame({ status: 'initialized' }),
+        frame(response('s1', 1)),
+        frame(response('s2', 2)),
+        last.subarray(0, 5),
+      ])
+    );
+    expect(startup.resolve).toHaveBeenCalledTimes(1);
+    expect(first.resolve).toHaveBeenCalledWith(response('s1', 1).result);
+    expect(second.resolve).toHaveBeenCalledWith(response('s2', 2).result);
+    expect(third.reject).not.toHaveBeenCalled();
+
+    module.handleStdoutData(last.subarray(5));
+    expect(third.reject).toHaveBeenCalledWith(new Error('Analysis failed'));
+  });
+
+  it('should finish startup on the init response rather than READY', () => {
+    const startup = { resolve: jest.fn(), reject: jest.fn() };
+    module.startup = startup;
+
+    module.handleStdoutData(frame('READY'));
+    expect(startup.resolve).not.toHaveBeenCalled();
+
+    module.handleStdoutData(frame({ error: 'No module named tensorflow' }));
+    expect(startup.resolve).not.toHaveBeenCalled();
+    expect(startup.reject).toHaveBeenCalledWith(
+      new Error('Python analyzer initialization failed: No module named tensorflow')
+    );
+    expect(module.startup).toBeNull();
+  });
+
+  it('should leave undefined config fields out of the frame', () => {
+    const write = jest.fn();
+    module.pythonProcess = { stdin: { write } };
+
+    module.writeFrame({ action: 'init', config: { modelType: undefined, sampleRate: 16000 } });
+
+    const data = Buffer.concat(write.mock.calls.map(([chunk]) => chunk));
+    expect(data.readUInt32LE(0)).toBe(data.length - 4);
+    const message = decode(data.subarray(4)) as any;
+    expect(message).toEqual({ action: 'init', config: { sampleRate: 16000 } });
+    expect('modelType' in message.config).toBe(false);
+  });
+
+  it('should keep a reused request key alive when the older request times out', async () => {
+    module.pythonProcess = { stdin: { write: jest.fn() } };
+
+    const first = module.processAudioFile('/tmp/a.wav', 's1', 1);
+    jest.advanceTimersByTime(3000);
+    const second = module.processAudioFile('/tmp/a.wav', 's1', 1);
+
+    jest.advanceTimersByTime(2000);
+    await expect(first).rejects.toThrow('Audio analysis timeout');
+    expect(module.pendingRequests.has('s1:1')).toBe(true);
+
+    module.handleStdoutData(frame(response('s1', 1)));
+    await expect(second).resolves.toEqual(response('s1', 1).result);
+    expect(module.pendingRequests.size).toBe(0);
+  });
+
+  it('should reject startup and pending requests when the process exits', async () => {
+    const startup = { resolve: jest.fn(), reject: jest.fn() };
+    module.startup = startup;
+    module.pythonProcess = { stdin: { write: jest.fn() } };
+    const first = module.processAudioFile('/tmp/a.wav', 's1', 1);
+    const second = module.processAudioFile('/tmp/b.wav', 's2', 2);
+
+    module.handleProcessExit(1);
+
+    expect(startup.reject).toHaveBeenCalledWith(
+      new Error('Python process exited with code 1 during initialization')
+    );
+    await expect(first).rejects.toThrow('Python process exited');
+    await expect(second).rejects.toThrow('Python process exited');
+    expect(module.pendingRequests.size).toBe(0);
+    expect(module.startup).toBeNull();
+    expect(module.pythonProcess).toBeNull();
+    expect(jest.getTimerCount()).toBe(0);
+  });
+});
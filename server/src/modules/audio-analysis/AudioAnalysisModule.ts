@@ -6,6 +6,7 @@
  */
 
 import { spawn, ChildProcess } from 'child_process';
+import { encode, decode } from './msgpack';
 import { EventEmitter } from 'events';
 import { promises as fs } from 'fs';
 import path from 'path';
@@ -24,6 +25,19 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
   private modelPath: string;
   private vadEnabled = true;
 
+  // Partial stdout frame carried over between data events
+  private frameBuffer: Buffer = Buffer.alloc(0);
+  // Settled by the response to the init request sent at startup
+  private startup: { resolve: () => void; reject: (error: Error) => void } | null = null;
+  private pendingRequests = new Map<
+    string,
+    {
+      resolve: (result: AudioEmotionResult) => void;
+      reject: (error: Error) => void;
+      timer: NodeJS.Timeout;
+    }
+  >();
+
   // Emotion labels (RAVDESS dataset standard)
   private readonly emotionLabels = [
     'neutral',
@@ -247,6 +261,20 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
         return;
       }
 
+      // Responses are matched back to requests by session and timestamp
+      const requestKey = `${sessionId}:${timestamp}`;
+
+      // Timeout after 5 seconds
+      const timer = setTimeout(() => {
+        // Leave the entry alone if a later request has reused the key
+        if (this.pendingRequests.get(requestKey)?.timer === timer) {
+          this.pendingRequests.delete(requestKey);
+        }
+        reject(new Error('Audio analysis timeout'));
+      }, 5000);
+
+      this.pendingRequests.set(requestKey, { resolve, reject, timer });
+
       const request = {
         action: 'analyze',
         audioPath,
@@ -259,35 +287,81 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
       };
 
       // Send request to Python process
-      this.pythonProcess.stdin?.write(JSON.stringify(request) + '\n');
-
-      // Set up one-time response handler
-      const responseHandler = (data: Buffer) => {
-        try {
-          const response = JSON.parse(data.toString());
-
-          if (response.sessionId === sessionId && response.timestamp === timestamp) {
-            this.pythonProcess?.stdout?.off('data', responseHandler);
-
-            if (response.error) {
-              reject(new Error(response.error));
-            } else {
-              resolve(response.result);
-            }
-          }
-        } catch (error) {
-          reject(new Error(`Failed to parse Python response: ${error}`));
-        }
-      };
+      this.writeFrame(request);
+    });
+  }
+
+  /**
+   * Write a message to the Python process as a length-prefixed msgpack frame
+   */
+  private writeFrame(message: unknown): void {
+    // Drop undefined properties as JSON.stringify did, rather than sending nil
+    const payload = encode(message, { ignoreUndefined: true });
+    const header = Buffer.alloc(4);
+    header.writeUInt32LE(payload.byteLength, 0);
+
+    this.pythonProcess?.stdin?.write(header);
+    this.pythonProcess?.stdin?.write(payload);
+  }
 
-      this.pythonProcess.stdout?.on('data', responseHandler);
+  /**
+   * Split Python stdout into length-prefixed msgpack frames and dispatch them
+   */
+  private handleStdoutData(data: Buffer): void {
+    this.frameBuffer = this.frameBuffer.length ? Buffer.concat([this.frameBuffer, data]) : data;
 
-      // Timeout after 5 seconds
-      setTimeout(() => {
-        this.pythonProcess?.stdout?.off('data', responseHandler);
-        reject(new Error('Audio analysis timeout'));
-      }, 5000);
-    });
+    while (this.frameBuffer.length >= 4) {
+      const length = this.frameBuffer.readUInt32LE(0);
+      if (this.frameBuffer.length < 4 + length) {
+        break;
+      }
+
+      const payload = this.frameBuffer.subarray(4, 4 + length);
+      this.frameBuffer = this.frameBuffer.subarray(4 + length);
+
+      try {
+        this.handleResponse(decode(payload));
+      } catch (error) {
+        console.error('Failed to parse Python response:', error);
+      }
+    }
+  }
+
+  /**
+   * Resolve the pending request a Python response belongs to
+   */
+  private handleResponse(response: any): void {
+    // READY only means the process is up; startup finishes once init has run
+    if (response === 'READY') {
+      return;
+    }
+
+    if (this.startup && response?.sessionId === undefined) {
+      const { resolve, reject } = this.startup;
+      this.startup = null;
+
+      if (response?.status === 'initialized') {
+        resolve();
+      } else {
+        reject(new Error(`Python analyzer initialization failed: ${response?.error}`));
+      }
+      return;
+    }
+
+    const requestKey = `${response?.sessionId}:${response?.timestamp}`;
+    const pending = this.pendingRequests.get(requestKey);
+    if (!pending) {
+      return;
+    }
+
+    this.pendingRequests.delete(requestKey);
+    clearTimeout(pending.timer);
+
+    if (response.error) {
+      pending.reject(new Error(response.error));
+    } else {
+      pending.resolve(response.result);
+    }
   }
 
   /**
@@ -323,7 +397,7 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
     return new Promise((resolve, reject) => {
       const python = spawn(
         this.config.pythonPath || 'python3',
-        ['-c', 'import librosa, tensorflow, numpy; print("OK")'],
+        ['-c', 'import librosa, tensorflow, numpy, msgpack; print("OK")'],
         {
           stdio: ['ignore', 'pipe', 'pipe'],
         }
@@ -338,7 +412,7 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
         if (code === 0 && output.includes('OK')) {
           resolve();
         } else {
-          reject(new Error('Python dependencies not available (librosa, tensorflow, numpy)'));
+          reject(new Error('Python dependencies not available (librosa, tensorflow, numpy, msgpack)'));
         }
       });
 
@@ -372,8 +446,30 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
     }
   }
 
+  /**
+   * Fail startup and any pending requests when the Python process exits
+   */
+  private handleProcessExit(code: number | null): void {
+    console.log(`Python process exited with code ${code}`);
+    this.pythonProcess = null;
+
+    if (this.startup) {
+      this.startup.reject(new Error(`Python process exited with code ${code} during initialization`));
+      this.startup = null;
+    }
+
+    // Fail anything still waiting on the process
+    this.pendingRequests.forEach(pending => {
+      clearTimeout(pending.timer);
+      pending.reject(new Error('Python process exited'));
+    });
+    this.pendingRequests.clear();
+  }
+
   /**
    * Start Python analysis process
+   *
+   * Resolves once the analyzer has loaded its model and finished its warmups.
    */
   private async startPythonProcess(): Promise<void> {
     return new Promise((resolve, reject) => {
@@ -384,23 +480,19 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
         stdio: ['pipe', 'pipe', 'pipe'],
       });
 
-      this.pythonProcess.stdout?.on('data', data => {
-        const output = data.toString().trim();
-        if (output === 'READY') {
-          resolve();
-        }
-      });
+      this.frameBuffer = Buffer.alloc(0);
+      this.startup = { resolve, reject };
+
+      this.pythonProcess.stdout?.on('data', (data: Buffer) => this.handleStdoutData(data));
 
       this.pythonProcess.stderr?.on('data', data => {
         console.error('Python process error:', data.toString());
       });
 
-      this.pythonProcess.on('exit', code => {
-        console.log(`Python process exited with code ${code}`);
-        this.pythonProcess = null;
-      });
+      this.pythonProcess.on('exit', code => this.handleProcessExit(code));
 
       this.pythonProcess.on('error', error => {
+        this.startup = null;
         reject(new Error(`Failed to start Python process: ${error.message}`));
       });
 
@@ -414,7 +506,7 @@ export class AudioAnalysisModule extends EventEmitter implements IAudioAnalysisM
         },
       };
 
-      this.pythonProcess.stdin?.write(JSON.stringify(initMessage) + '\n');
+      this.writeFrame(initMessage);
     });
   }
 
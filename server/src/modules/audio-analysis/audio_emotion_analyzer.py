@@ -4,20 +4,106 @@ Audio Emotion Analyzer
 Python script for audio emotion recognition using librosa and TensorFlow
 """
 
+import os
 import sys
-import json
+import importlib.util
+import time
+import struct
+import queue
+import threading
+import contextlib
+import platform
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import librosa
 import numpy as np
-import tensorflow as tf
+import msgpack
+import scipy.fft
+import soundfile as sf
+from numba import njit
+from scipy.signal import get_window, resample_poly, stft
 from pathlib import Path
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
 import warnings
 warnings.filterwarnings('ignore')
 
+# Prefer FFTW's planned SIMD kernels for our same-size STFTs when available;
+# scipy.signal and librosa both go through scipy.fft, so registering the backend there covers them
+if pyfftw is not None:
+    pyfftw.interfaces.cache.enable()
+    scipy.fft.set_global_backend(pyfftw.interfaces.scipy_fft)
+
+# TFLite's INT8 kernels only pay off on ARM; on x86 they can be slower than FP32,
+# so other machines get FP16 weights (half the size, FP32 compute) instead.
+# ARM gets dynamic-range quantization (INT8 weights, float model input): the raw
+# features span -600 to 8000, so a single INT8 input scale would zero most of them
+INT8_MACHINES = {'aarch64', 'armv7l', 'arm64'}
+
+# Micro-batching: run the model on up to MAX_BATCH queued requests at once,
+# waiting at most MAX_WAIT seconds for a batch to fill
+MAX_BATCH = 16
+MAX_WAIT = 0.005
+
+# Clips whose mean frame RMS is at or below this are treated as silence
+VAD_ENERGY_THRESHOLD = 0.01
+
+# Flush stdout after this many responses, or sooner once no input is waiting
+FLUSH_EVERY = 8
+
+# Batches at least this large go through the CUDA pipeline when one is available
+GPU_MIN_BATCH = 8
+
+@njit(cache=True, fastmath=True)
+def _zcr(y):
+    """Global zero-crossing rate of a signal in one linear scan"""
+    if y.shape[0] < 2:
+        return 0.0
+    crossings = 0
+    prev = y[0] >= 0
+    for i in range(1, y.shape[0]):
+        cur = y[i] >= 0
+        if cur != prev:
+            crossings += 1
+        prev = cur
+    return crossings / (y.shape[0] - 1)
+
 class AudioEmotionAnalyzer:
     def __init__(self):
         self.model = None
+        self.interpreter = None
+        self.input_details = None
+        self.output_details = None
+        self._infer = None
+        self._dense_layers = None
+        self._gpu = None
+        self._executor = None
+        self._pool_workers = 0
+        self._pool_barrier = None
+        self._pool_warmup = []
+        self._input_buf = np.zeros((MAX_BATCH, 40), np.float32)
+        self._feat_buf = np.zeros(40, np.float32)
+        self._batch_feat_buf = np.zeros((MAX_BATCH, 40), np.float32)
+        self._neutral_scores = {'neutral': 1.0}
         self.emotion_labels = []
-        self.sample_rate = 48000
+        self._labels_tuple = ()
+        self.sample_rate = 16000  # MFCC-based emotion features don't need more than 16 kHz
+        self.max_duration = 3.0
+        self.n_fft = 512
+        self.hop_length = 256
+        # Periodic Hann window, as librosa uses
+        self._win = get_window('hann', self.n_fft).astype(np.float32)
+        self.n_mels = 40
+        self._mel_fb = librosa.filters.mel(
+            sr=self.sample_rate, n_fft=self.n_fft, n_mels=self.n_mels
+        ).astype(np.float32)
+        # Sized for the 48 kHz mono clips the Node module writes; grows on demand
+        self._audio_buf = np.empty((int(48000 * self.max_duration), 1), np.float32)
         self.model_path = None
         self.model_type = 'fast'
 
@@ -28,17 +114,102 @@ class AudioEmotionAnalyzer:
         self.emotion_labels = config.get('emotionLabels', [
             'neutral', 'calm', 'happy', 'sad', 'angry', 'fearful', 'disgust', 'surprised'
         ])
+        self._labels_tuple = tuple(self.emotion_labels)
+        self._neutral_scores = {label: 0.0 for label in self.emotion_labels}
+        self._neutral_scores['neutral'] = 1.0
 
         # Load or create model
         self.load_model()
+        self._gpu = self.create_gpu_pipeline(config)
+
+        # Run one clip through feature extraction and inference now so the first
+        # request doesn't pay for FFT planning, kernel selection or XLA compiles
+        self.analyze_audio_from_array(self.warmup_signal(), 'warmup', 0)
+
+        # Likewise create the CUDA context and cuFFT plans before the first large batch
+        if self._gpu is not None:
+            try:
+                self._gpu.warmup()
+            except Exception as e:
+                print(f"GPU pipeline warmup failed, using CPU: {e}", file=sys.stderr)
+                self._gpu = None
+
+        # Spawned pool workers import librosa and build their analyzer on first use,
+        # which takes seconds each; bring them all up before the first batch
+        if self._executor is not None:
+            try:
+                self.warm_pool()
+            except Exception as e:
+                print(f"Feature extraction pool warmup failed: {e}", file=sys.stderr)
+
+    def warmup_signal(self):
+        """Seeded low-level noise clip for warmups
+
+        Noise rather than zeros, which would take the silence shortcut.
+        """
+        warmup = np.random.default_rng(0).standard_normal(int(self.sample_rate * self.max_duration))
+        return (0.1 * warmup).astype(np.float32)
+
+    def start_pool(self, workers):
+        """Start a pool of worker processes for batch feature extraction
+
+        Workers are spawned rather than forked so they don't inherit TensorFlow state.
+        """
+        context = multiprocessing.get_context('spawn')
+        self._pool_workers = workers
+        self._pool_barrier = context.Barrier(workers)
+        self._pool_warmup = []
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._pool_barrier,)
+        )
+
+    def warm_pool(self, wait=True):
+        """Start every pool worker, waiting for all of them to be ready if wait is set"""
+        # A timed-out warmup leaves the barrier broken; start each warmup from a clean one
+        self._pool_barrier.reset()
+
+        # Each task holds its worker at the barrier, so every worker has to start to finish them
+        self._pool_warmup = [self._executor.submit(_warm_worker) for _ in range(self._pool_workers)]
+        if wait:
+            for future in self._pool_warmup:
+                future.result()
+
+    def pool_ready(self):
+        """Whether the pool is running and done warming up"""
+        return self._executor is not None and all(future.done() for future in self._pool_warmup)
+
+    def restart_pool(self):
+        """Replace a broken pool, starting the new workers in the background
+
+        Batches are extracted in this process until pool_ready() reports the new workers are up.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.start_pool(self._pool_workers)
+        self.warm_pool(wait=False)
+
+    def shutdown_pool(self):
+        """Stop the feature-extraction pool if one is running"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
 
     def load_model(self):
         """Load pre-trained model or create a simple one"""
+        # TensorFlow is imported lazily so feature-extraction workers never load it;
+        # XLA flags must be in the environment before the import
+        os.environ.setdefault('TF_XLA_FLAGS', '--tf_xla_auto_jit=2 --tf_xla_cpu_global_jit')
+        import tensorflow as tf
+
         model_file = Path(self.model_path) / f"{self.model_type}_model.h5"
+        source_file = None
 
         if model_file.exists():
             try:
                 self.model = tf.keras.models.load_model(str(model_file))
+                source_file = model_file
                 print(f"Loaded model from {model_file}", file=sys.stderr)
             except Exception as e:
                 print(f"Failed to load model: {e}", file=sys.stderr)
@@ -47,8 +218,33 @@ class AudioEmotionAnalyzer:
             print(f"Model file not found: {model_file}, creating dummy model", file=sys.stderr)
             self.create_dummy_model()
 
+        self.interpreter = None
+        self._infer = None
+
+        # Plain Dense MLPs (including the dummy models) run as a NumPy forward pass
+        self._dense_layers = self.extract_dense_layers()
+        if self._dense_layers is not None:
+            print("Using NumPy forward pass", file=sys.stderr)
+            return
+
+        try:
+            self.build_interpreter(source_file)
+        except Exception as e:
+            print(f"TFLite conversion failed, using Keras model: {e}", file=sys.stderr)
+            self.interpreter = None
+            tf.config.optimizer.set_jit(True)
+            # Trace the forward pass once instead of going through predict() per request,
+            # compiled with XLA for the fixed 40-feature input
+            self._infer = tf.function(
+                lambda x: self.model(x, training=False),
+                input_signature=[tf.TensorSpec([None, 40], tf.float32)],
+                jit_compile=True
+            ).get_concrete_function()
+
     def create_dummy_model(self):
         """Create a simple dummy model for demonstration"""
+        import tensorflow as tf
+
         # Simple model that outputs random predictions
         # In production, this would be replaced with a trained CNN/RNN model
         input_shape = (40,)  # 40 MFCC features
@@ -77,163 +273,705 @@ class AudioEmotionAnalyzer:
         self.model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
         print(f"Created dummy {self.model_type} model", file=sys.stderr)
 
-    def extract_features(self, audio_path):
-        """Extract MFCC and other audio features"""
+    def extract_dense_layers(self):
+        """Return (weights, bias, activation) per layer if the model is a plain Dense MLP"""
+        import tensorflow as tf
+
+        dense_layers = []
+        for layer in self.model.layers:
+            # Dropout is the identity at inference time
+            if isinstance(layer, tf.keras.layers.Dropout):
+                continue
+            if not isinstance(layer, tf.keras.layers.Dense):
+                return None
+
+            activation = layer.get_config()['activation']
+            if activation not in ('relu', 'softmax', 'linear'):
+                return None
+
+            weights = layer.get_weights()
+            kernel = weights[0].astype(np.float32)
+            bias = weights[1].astype(np.float32) if len(weights) > 1 else np.zeros(kernel.shape[1], np.float32)
+            dense_layers.append((kernel, bias, activation))
+
+        return dense_layers or None
+
+    def build_interpreter(self, source_file=None):
+        """Convert the Keras model to TFLite and keep a single interpreter resident"""
+        import tensorflow as tf
+
+        quantization = 'dynamic' if platform.machine() in INT8_MACHINES else 'fp16'
+        tflite_model = None
+        cache_file = None
+
+        # Only trained models are cached; dummy models are rebuilt on every start
+        if source_file is not None:
+            cache_file = Path(self.model_path) / f"{self.model_type}_model.{quantization}.tflite"
+            if cache_file.exists() and cache_file.stat().st_mtime >= source_file.stat().st_mtime:
+                tflite_model = cache_file.read_bytes()
+                print(f"Loaded TFLite model from {cache_file}", file=sys.stderr)
+
+        if tflite_model is None:
+            tflite_model = self.convert_model(quantization)
+            if cache_file is not None:
+                try:
+                    cache_file.write_bytes(tflite_model)
+                except OSError as e:
+                    print(f"Failed to cache TFLite model: {e}", file=sys.stderr)
+
+        self.interpreter = tf.lite.Interpreter(model_content=tflite_model)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        print(f"Using {quantization.upper()} TFLite interpreter", file=sys.stderr)
+
+    def convert_model(self, quantization):
+        """Convert the Keras model to a TFLite flatbuffer"""
+        import tensorflow as tf
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+
+        if quantization == 'dynamic':
+            # Dynamic-range quantization: INT8 weights, inputs and outputs stay FP32
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        elif quantization == 'fp16':
+            # Weight-only FP16 quantization; inputs and outputs stay FP32
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+
+        # The converter prints export logs to stdout, which is our response channel
+        with contextlib.redirect_stdout(sys.stderr):
+            return converter.convert()
+
+    def create_gpu_pipeline(self, config):
+        """Build the CUDA pipeline for large batches if enabled and PyTorch and a GPU are available"""
+        # Opt-in, so PyTorch is only loaded next to TensorFlow when a GPU is expected
+        use_gpu = config.get('useGpu', os.environ.get('AUDIO_ANALYSIS_GPU') == '1')
+        if not use_gpu or importlib.util.find_spec('torch') is None:
+            return None
+
+        import torch
+
+        if not torch.cuda.is_available():
+            return None
+
         try:
-            # Load audio file
-            y, sr = librosa.load(audio_path, sr=self.sample_rate, duration=3.0)
-
-            # Extract MFCC features (13 coefficients)
-            mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-            mfcc_mean = np.mean(mfcc, axis=1)
-            mfcc_std = np.std(mfcc, axis=1)
-
-            # Extract additional features
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-            zero_crossing_rate = np.mean(librosa.feature.zero_crossing_rate(y))
-            energy = np.mean(librosa.feature.rms(y=y))
-
-            # Combine features
-            features = np.concatenate([
-                mfcc_mean,
-                mfcc_std,
-                [spectral_centroid, zero_crossing_rate, energy]
-            ])
+            pipeline = TorchAudioPipeline(self, torch.device('cuda'))
+        except Exception as e:
+            print(f"GPU pipeline unavailable: {e}", file=sys.stderr)
+            return None
 
-            # Pad or truncate to expected size (40 features)
-            if len(features) < 40:
-                features = np.pad(features, (0, 40 - len(features)), 'constant')
-            else:
-                features = features[:40]
+        print(f"Using CUDA pipeline for batches of {GPU_MIN_BATCH} or more", file=sys.stderr)
+        return pipeline
 
-            return {
-                'features': features.tolist(),
-                'mfcc': mfcc_mean.tolist(),
-                'spectralCentroid': float(spectral_centroid),
-                'zeroCrossingRate': float(zero_crossing_rate),
-                'energy': float(energy)
-            }
+    def load_audio(self, audio_path):
+        """Load up to max_duration seconds of mono audio at the analysis rate
+
+        The returned signal may be a view of a buffer reused by the next call.
+        """
+        # Read at most max_duration seconds at the file's native rate
+        # into the persistent audio buffer
+        with sf.SoundFile(audio_path) as f:
+            sr = f.samplerate
+            frames = int(sr * self.max_duration)
+            if len(self._audio_buf) < frames or self._audio_buf.shape[1] != f.channels:
+                self._audio_buf = np.empty((frames, f.channels), np.float32)
+            data = f.read(out=self._audio_buf[:frames])
+
+        # Downmix to mono
+        y = data[:, 0] if data.shape[1] == 1 else data.mean(axis=1)
+
+        # Resample once to the analysis rate with a polyphase filter
+        if sr != self.sample_rate:
+            y = resample_poly(y, self.sample_rate, sr).astype(np.float32, copy=False)
+
+        return y
+
+    def extract_features(self, audio_path, out=None):
+        """Extract MFCC and other audio features
+
+        The feature vector is written into out, or into a buffer reused by the
+        next call when out is None.
+        """
+        try:
+            y = self.load_audio(audio_path)
+            return self.compute_features(y, self.sample_rate, out)
 
         except Exception as e:
             print(f"Feature extraction error: {e}", file=sys.stderr)
             # Return zero features on error
+            features = self._feat_buf if out is None else out
+            features[:] = 0.0
             return {
-                'features': [0.0] * 40,
-                'mfcc': [0.0] * 13,
+                'features': features,
+                'mfcc': np.zeros(13),
                 'spectralCentroid': 0.0,
                 'zeroCrossingRate': 0.0,
                 'energy': 0.0
             }
 
+    def compute_features(self, y, sr, out=None):
+        """Compute the 40-feature vector from a loaded signal"""
+        features = self._feat_buf if out is None else out
+
+        # Time-domain features first; silent clips skip the spectral work
+        zero_crossing_rate = _zcr(y)
+        energy = np.mean(librosa.feature.rms(y=y, frame_length=self.n_fft, hop_length=self.hop_length))
+
+        if energy <= VAD_ENERGY_THRESHOLD:
+            features[:] = 0.0
+            features[27:29] = zero_crossing_rate, energy
+            return {
+                'features': features,
+                'mfcc': np.zeros(13),
+                'spectralCentroid': 0.0,
+                'zeroCrossingRate': float(zero_crossing_rate),
+                'energy': float(energy)
+            }
+
+        # One STFT shared by every spectral feature, framed like librosa's
+        # centered STFT (n_fft // 2 zeros each side) and scaled back from
+        # scipy's 1 / sum(window) spectrum scaling
+        padded = np.pad(y, self.n_fft // 2)
+        _, _, spectrum = stft(padded, fs=sr, window=self._win, nperseg=self.n_fft,
+                              noverlap=self.n_fft - self.hop_length, boundary=None, padded=False)
+        magnitude = np.abs(spectrum)
+        magnitude *= self._win.sum()
+        power = magnitude ** 2
+
+        # Extract MFCC features (13 coefficients)
+        mel = self._mel_fb @ power
+        mfcc = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=13)
+
+        # Mean and std from a single pass of sums (float64 to avoid cancellation)
+        n_frames = mfcc.shape[1]
+        mfcc_mean = mfcc.sum(axis=1, dtype=np.float64) / n_frames
+        mfcc_sq_mean = np.einsum('ij,ij->i', mfcc, mfcc, dtype=np.float64) / n_frames
+        mfcc_std = np.sqrt(np.maximum(mfcc_sq_mean - mfcc_mean ** 2, 0.0))
+
+        # Extract additional features
+        spectral_centroid = np.mean(librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=self.n_fft))
+
+        # Combine features into the 40-feature model input (zero padded)
+        features[0:13] = mfcc_mean
+        features[13:26] = mfcc_std
+        features[26:29] = spectral_centroid, zero_crossing_rate, energy
+        features[29:] = 0.0
+
+        return {
+            'features': features,
+            'mfcc': mfcc_mean,
+            'spectralCentroid': float(spectral_centroid),
+            'zeroCrossingRate': float(zero_crossing_rate),
+            'energy': float(energy)
+        }
+
     def predict_emotion(self, features):
         """Predict emotion from features"""
-        try:
-            # Reshape features for model input
-            features_array = np.array(features['features']).reshape(1, -1)
+        return self.predict_emotions([features])[0]
 
-            # Get prediction
-            predictions = self.model.predict(features_array, verbose=0)
-            probabilities = predictions[0]
+    def predict_emotions(self, features_list, include_scores=None):
+        """Predict emotions for a batch of features with a single model call
 
-            # Create emotion scores dictionary
-            scores = {}
-            for i, label in enumerate(self.emotion_labels):
-                scores[label] = float(probabilities[i])
+        include_scores optionally gives a per-item flag; items without it get
+        only the dominant emotion and confidence.
+        """
+        if include_scores is None:
+            include_scores = [True] * len(features_list)
 
-            # Find dominant emotion
-            dominant_idx = np.argmax(probabilities)
-            dominant_emotion = self.emotion_labels[dominant_idx]
-            confidence = float(probabilities[dominant_idx])
+        try:
+            # Copy features into the preallocated model input
+            features_array = self.input_rows(len(features_list))
+            for i, features in enumerate(features_list):
+                features_array[i] = features['features']
+
+            # Get predictions
+            if self._dense_layers is not None:
+                predictions = self.forward_dense(features_array)
+            elif self.interpreter is not None:
+                predictions = self.invoke_interpreter(features_array)
+            else:
+                # XLA compiles one cluster per input shape, so pass whole MAX_BATCH blocks
+                padded_rows = -(-len(features_list) // MAX_BATCH) * MAX_BATCH
+                predictions = self._infer(self._input_buf[:padded_rows]).numpy()[:len(features_list)]
 
-            return {
-                'emotion': dominant_emotion,
-                'confidence': confidence,
-                'scores': scores
-            }
+            return [
+                self.emotion_result(probabilities, with_scores)
+                for probabilities, with_scores in zip(predictions, include_scores)
+            ]
 
         except Exception as e:
             print(f"Prediction error: {e}", file=sys.stderr)
             # Return neutral emotion on error
-            scores = {label: 0.0 for label in self.emotion_labels}
-            scores['neutral'] = 1.0
-
-            return {
-                'emotion': 'neutral',
-                'confidence': 1.0,
-                'scores': scores
-            }
-
-    def analyze_audio(self, audio_path, session_id, timestamp):
+            return [self.neutral_result(with_scores) for with_scores in include_scores]
+
+    def neutral_result(self, include_scores=True):
+        """Emotion result used for silence and failed predictions"""
+        result = {'emotion': 'neutral', 'confidence': 1.0}
+        if include_scores:
+            result['scores'] = self._neutral_scores
+        return result
+
+    def input_rows(self, count):
+        """Return the first count rows of the model input buffer
+
+        The buffer grows in whole MAX_BATCH blocks so the XLA path can always
+        pass a padded block.
+        """
+        if count > len(self._input_buf):
+            self._input_buf = np.zeros((-(-count // MAX_BATCH) * MAX_BATCH, 40), np.float32)
+        return self._input_buf[:count]
+
+    def emotion_result(self, probabilities, include_scores=True):
+        """Build the emotion result for one row of model output"""
+        # Find dominant emotion
+        dominant_idx = int(np.argmax(probabilities))
+        probs_list = probabilities.tolist()
+        result = {
+            'emotion': self._labels_tuple[dominant_idx],
+            'confidence': probs_list[dominant_idx]
+        }
+
+        # Create emotion scores dictionary
+        if include_scores:
+            result['scores'] = dict(zip(self._labels_tuple, probs_list))
+
+        return result
+
+    def forward_dense(self, features_array):
+        """Run the Dense MLP as plain matrix products"""
+        x = features_array
+        for kernel, bias, activation in self._dense_layers:
+            x = x @ kernel + bias
+            if activation == 'relu':
+                np.maximum(x, 0, out=x)
+            elif activation == 'softmax':
+                x = np.exp(x - x.max(axis=1, keepdims=True))
+                x /= x.sum(axis=1, keepdims=True)
+
+        return x
+
+    def invoke_interpreter(self, features_array):
+        """Run the TFLite interpreter"""
+        # Resize the input only when the batch size changes
+        if self.input_details['shape'][0] != len(features_array):
+            self.interpreter.resize_tensor_input(self.input_details['index'], features_array.shape)
+            self.interpreter.allocate_tensors()
+            self.input_details = self.interpreter.get_input_details()[0]
+            self.output_details = self.interpreter.get_output_details()[0]
+
+        self.interpreter.set_tensor(self.input_details['index'], features_array)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_details['index'])
+
+    def analyze_audio(self, audio_path, session_id, timestamp, include_scores=True):
         """Analyze audio file for emotion"""
-        try:
-            # Extract features
-            features = self.extract_features(audio_path)
+        return self.analyze_batch([(audio_path, session_id, timestamp, include_scores)])[0]
 
-            # Predict emotion
-            emotion_result = self.predict_emotion(features)
+    def analyze_audio_from_array(self, y, session_id, timestamp, include_scores=True):
+        """Analyze a mono signal already at the analysis rate, skipping file I/O"""
+        try:
+            features = self.compute_features(y, self.sample_rate)
+            if features['energy'] > VAD_ENERGY_THRESHOLD:
+                emotion_result = self.predict_emotions([features], [include_scores])[0]
+            else:
+                emotion_result = self.neutral_result(include_scores)
 
-            # Create result
-            result = {
+        except Exception as e:
+            print(f"Analysis error: {e}", file=sys.stderr)
+            return {
                 'sessionId': session_id,
                 'timestamp': timestamp,
-                'emotion': emotion_result['emotion'],
-                'confidence': emotion_result['confidence'],
-                'scores': emotion_result['scores'],
-                'features': {
-                    'mfcc': features['mfcc'],
-                    'spectralCentroid': features['spectralCentroid'],
-                    'zeroCrossingRate': features['zeroCrossingRate'],
-                    'energy': features['energy']
-                },
-                'voiceActivity': features['energy'] > 0.01,  # Simple VAD based on energy
-                'duration': 1.0  # Assume 1 second duration
+                'error': str(e)
             }
 
-            return result
+        return self.analysis_result(session_id, timestamp, features, emotion_result)
+
+    def analyze_batch(self, requests):
+        """Analyze (audio_path, session_id, timestamp, include_scores) requests with one model call"""
+        try:
+            audio_paths = [audio_path for audio_path, _, _, _ in requests]
+            include_scores = [with_scores for _, _, _, with_scores in requests]
+            features_list = None
+            predictions = None
+
+            # Extract features on the GPU for large batches, in worker processes
+            # when a pool is running, otherwise in this process
+            if self._gpu is not None and len(requests) >= GPU_MIN_BATCH:
+                try:
+                    features_list, predictions = self._gpu.analyze(audio_paths)
+                except Exception as e:
+                    # CUDA OOM or driver errors; the CPU paths below still work
+                    print(f"GPU pipeline error, using CPU: {e}", file=sys.stderr)
+
+            if features_list is None and len(requests) > 1 and self.pool_ready():
+                try:
+                    features_list = list(self._executor.map(_extract_worker, audio_paths))
+                except BrokenProcessPool as e:
+                    # A worker died (OOM, decoder crash); replace the pool and
+                    # extract this batch here
+                    print(f"Feature extraction pool broken, restarting: {e}", file=sys.stderr)
+                    self.restart_pool()
+
+            if features_list is None:
+                # Write features into rows of the persistent batch buffer
+                if len(requests) > len(self._batch_feat_buf):
+                    self._batch_feat_buf = np.zeros((len(requests), 40), np.float32)
+                rows = self._batch_feat_buf
+                features_list = [
+                    self.extract_features(audio_path, rows[i]) for i, audio_path in enumerate(audio_paths)
+                ]
+
+            # Silent clips are neutral without running the model
+            emotion_results = [self.neutral_result(with_scores) for with_scores in include_scores]
+            voiced = [i for i, features in enumerate(features_list) if features['energy'] > VAD_ENERGY_THRESHOLD]
+            if predictions is not None:
+                for i in voiced:
+                    emotion_results[i] = self.emotion_result(predictions[i], include_scores[i])
+            elif voiced:
+                voiced_results = self.predict_emotions(
+                    [features_list[i] for i in voiced], [include_scores[i] for i in voiced])
+                for i, emotion_result in zip(voiced, voiced_results):
+                    emotion_results[i] = emotion_result
 
         except Exception as e:
             print(f"Analysis error: {e}", file=sys.stderr)
-            return {
+            return [{
                 'sessionId': session_id,
                 'timestamp': timestamp,
                 'error': str(e)
-            }
+            } for _, session_id, timestamp, _ in requests]
+
+        return [
+            self.analysis_result(session_id, timestamp, features, emotion_result)
+            for (_, session_id, timestamp, _), features, emotion_result
+            in zip(requests, features_list, emotion_results)
+        ]
+
+    def analysis_result(self, session_id, timestamp, features, emotion_result):
+        """Assemble the response for one analyzed clip"""
+        return {
+            'sessionId': session_id,
+            'timestamp': timestamp,
+            **emotion_result,
+            'features': {
+                'mfcc': features['mfcc'],
+                'spectralCentroid': features['spectralCentroid'],
+                'zeroCrossingRate': features['zeroCrossingRate'],
+                'energy': features['energy']
+            },
+            'voiceActivity': features['energy'] > VAD_ENERGY_THRESHOLD,  # Simple VAD based on energy
+            'duration': 1.0  # Assume 1 second duration
+        }
+
+class TorchAudioPipeline:
+    """Batched feature extraction and Dense MLP inference with PyTorch on a GPU
+
+    Mirrors AudioEmotionAnalyzer.compute_features (same STFT framing, mel
+    filterbank, dB clipping and DCT) so both paths produce the same features.
+    """
+
+    def __init__(self, analyzer, device):
+        import torch
+
+        self.analyzer = analyzer
+        self.device = device
+        self.length = int(analyzer.sample_rate * analyzer.max_duration)
+
+        self.window = torch.hann_window(analyzer.n_fft, device=device)
+        self.mel_fb = torch.from_numpy(analyzer._mel_fb).to(device)
+        dct = scipy.fft.dct(np.eye(analyzer.n_mels), type=2, norm='ortho', axis=0)[:13]
+        self.dct = torch.from_numpy(dct.astype(np.float32)).to(device)
+        freqs = librosa.fft_frequencies(sr=analyzer.sample_rate, n_fft=analyzer.n_fft)
+        self.freqs = torch.from_numpy(freqs.astype(np.float32)).to(device).unsqueeze(1)
+
+        # Port the Dense MLP so the whole batch stays on the device
+        self.classifier = None
+        if analyzer._dense_layers is not None:
+            layers = []
+            for kernel, bias, activation in analyzer._dense_layers:
+                linear = torch.nn.Linear(*kernel.shape)
+                with torch.no_grad():
+                    linear.weight.copy_(torch.from_numpy(kernel.T))
+                    linear.bias.copy_(torch.from_numpy(bias))
+                layers.append(linear)
+                if activation == 'relu':
+                    layers.append(torch.nn.ReLU())
+                elif activation == 'softmax':
+                    layers.append(torch.nn.Softmax(dim=1))
+            self.classifier = torch.nn.Sequential(*layers).to(device).eval()
+
+    def analyze(self, audio_paths):
+        """Return (features_list, predictions) for a batch of audio files
+
+        predictions is None when the model could not be ported to PyTorch.
+        """
+        return self.compute(*self.load(audio_paths))
+
+    def warmup(self):
+        """Create the CUDA context, cuFFT plans and kernels with a batch of noise clips"""
+        import torch
+
+        waveforms = torch.zeros((GPU_MIN_BATCH, self.length))
+        waveforms[:] = torch.from_numpy(self.analyzer.warmup_signal()[:self.length])
+        lengths = torch.full((GPU_MIN_BATCH,), self.length, dtype=torch.long)
+        self.compute(waveforms, lengths)
+
+    def load(self, audio_paths):
+        """Read a batch of audio files into zero-padded (waveforms, lengths) host tensors"""
+        import torch
+
+        waveforms = torch.zeros((len(audio_paths), self.length), pin_memory=self.device.type == 'cuda')
+        lengths = torch.zeros(len(audio_paths), dtype=torch.long)
+        for i, audio_path in enumerate(audio_paths):
+            try:
+                y = self.analyzer.load_audio(audio_path)[:self.length]
+            except Exception as e:
+                print(f"Feature extraction error: {e}", file=sys.stderr)
+                continue
+            waveforms[i, :len(y)] = torch.from_numpy(y)
+            lengths[i] = len(y)
+
+        return waveforms, lengths
+
+    def compute(self, waveforms, lengths):
+        """Return (features_list, predictions) for zero-padded waveforms of the given lengths"""
+        import torch
+
+        analyzer = self.analyzer
+        n_fft, hop_length = analyzer.n_fft, analyzer.hop_length
+
+        # Copy the stacked waveforms over in one go
+        with torch.inference_mode():
+            y = waveforms.to(self.device, non_blocking=True)
+            lengths = lengths.to(self.device)
+
+            # Frames that belong to each clip (librosa's centered framing)
+            n_frames = 1 + self.length // hop_length
+            valid = torch.arange(n_frames, device=self.device) < (1 + lengths // hop_length).unsqueeze(1)
+            valid = valid & (lengths > 0).unsqueeze(1)
+            counts = valid.sum(dim=1).clamp(min=1)
+
+            # Shared STFT, as in compute_features
+            stft = torch.stft(y, n_fft, hop_length=hop_length, window=self.window,
+                              center=True, pad_mode='constant', return_complex=True)
+            magnitude = stft.abs()
+            power = magnitude ** 2
+
+            # MFCCs: mel filterbank, power_to_db with per-clip 80 dB floor, DCT-II
+            db = 10.0 * torch.log10(torch.clamp(self.mel_fb @ power, min=1e-10))
+            db = torch.maximum(db, db.amax(dim=(1, 2), keepdim=True) - 80.0)
+            mfcc = (self.dct @ db).double() * valid.unsqueeze(1)
+            mfcc_mean = mfcc.sum(dim=2) / counts.unsqueeze(1)
+            mfcc_std = torch.sqrt(torch.clamp((mfcc ** 2).sum(dim=2) / counts.unsqueeze(1) - mfcc_mean ** 2, min=0.0))
+
+            # Spectral centroid of each frame, zero for silent frames
+            total = magnitude.sum(dim=1)
+            centroid = (self.freqs * magnitude).sum(dim=1) / torch.clamp(total, min=1e-30)
+            centroid = torch.where(total > 0, centroid, torch.zeros_like(centroid))
+            spectral_centroid = (centroid * valid).sum(dim=1) / counts
+
+            # Global zero-crossing rate over each clip's own samples
+            positive = y >= 0
+            crossings = (positive[:, 1:] != positive[:, :-1])
+            crossings = crossings & (torch.arange(self.length - 1, device=self.device) < (lengths - 1).unsqueeze(1))
+            zero_crossing_rate = crossings.sum(dim=1) / torch.clamp(lengths - 1, min=1)
+
+            # Frame RMS energy with the same centered zero padding as librosa
+            frames = torch.nn.functional.pad(y, (n_fft // 2, n_fft // 2)).unfold(1, n_fft, hop_length)
+            rms = torch.sqrt((frames ** 2).mean(dim=2))
+            energy = (rms * valid).sum(dim=1) / counts
+
+            features = torch.zeros((len(waveforms), 40), device=self.device)
+            features[:, 0:13] = mfcc_mean.float()
+            features[:, 13:26] = mfcc_std.float()
+            features[:, 26] = spectral_centroid
+            features[:, 27] = zero_crossing_rate.float()
+            features[:, 28] = energy
+            features = features * (lengths > 0).unsqueeze(1)
+
+            # Silent clips keep only their time-domain features, as on the CPU path
+            voiced = (energy > VAD_ENERGY_THRESHOLD).unsqueeze(1)
+            features[:, 0:27] = features[:, 0:27] * voiced
+            mfcc_mean = mfcc_mean * voiced
+
+            predictions = None
+            if self.classifier is not None:
+                predictions = self.classifier(features).cpu().numpy()
+
+            features = features.cpu().numpy()
+            mfcc_mean = (mfcc_mean * (lengths > 0).unsqueeze(1)).cpu().numpy()
+
+        features_list = [{
+            'features': features[i],
+            'mfcc': mfcc_mean[i],
+            'spectralCentroid': float(features[i, 26]),
+            'zeroCrossingRate': float(features[i, 27]),
+            'energy': float(features[i, 28])
+        } for i in range(len(features))]
+
+        return features_list, predictions
+
+# Per-process analyzer used only for feature extraction in pool workers
+_worker_analyzer = None
+_worker_barrier = None
+
+def _init_worker(barrier):
+    """Create and warm up the feature-extraction analyzer for a pool worker"""
+    global _worker_analyzer, _worker_barrier
+    _worker_analyzer = AudioEmotionAnalyzer()
+    _worker_analyzer.compute_features(_worker_analyzer.warmup_signal(), _worker_analyzer.sample_rate)
+    _worker_barrier = barrier
+
+def _warm_worker():
+    """Wait until every pool worker has started and taken one of these tasks"""
+    _worker_barrier.wait(timeout=60)
+
+def _extract_worker(audio_path):
+    """Extract features for one audio file inside a pool worker"""
+    return _worker_analyzer.extract_features(audio_path)
+
+def _encode_numpy(obj):
+    """msgpack fallback for the NumPy arrays and scalars in analysis results"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+def read_frame(stream):
+    """Read one length-prefixed payload, or None at EOF"""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (length,) = struct.unpack('<I', header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return payload
+
+def write_frame(stream, payload):
+    """Write one payload behind its 4-byte little-endian length"""
+    stream.write(struct.pack('<I', len(payload)))
+    stream.write(payload)
+
+def read_requests(stream, pending):
+    """Queue (sequence number, payload) pairs from stdin, then None at EOF"""
+    seq = 0
+    while True:
+        payload = read_frame(stream)
+        if payload is None:
+            break
+        pending.put((seq, payload))
+        seq += 1
+    pending.put(None)
+
+def next_batch(pending):
+    """Block for one request, then collect up to MAX_BATCH within MAX_WAIT"""
+    batch = [pending.get()]
+    deadline = time.monotonic() + MAX_WAIT
+
+    while batch[-1] is not None and len(batch) < MAX_BATCH:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(pending.get(timeout=timeout))
+        except queue.Empty:
+            break
 
-def main():
-    analyzer = AudioEmotionAnalyzer()
+    return batch
 
-    # Signal ready
-    print("READY")
-    sys.stdout.flush()
+def process_batch(analyzer, batch):
+    """Handle a batch of (seq, payload) requests, returning (seq, response) in order"""
+    responses = []
+    analyze_group = []
 
-    # Process requests
-    for line in sys.stdin:
+    def flush_analyze_group():
+        results = analyzer.analyze_batch([item for _, item in analyze_group])
+        for (seq, (_, session_id, timestamp, _)), result in zip(analyze_group, results):
+            responses.append((seq, {'result': result, 'sessionId': session_id, 'timestamp': timestamp}))
+        analyze_group.clear()
+
+    for seq, payload in batch:
         try:
-            request = json.loads(line.strip())
+            request = msgpack.unpackb(payload, raw=False)
             action = request.get('action')
 
+            # Consecutive analyze requests share one model call
+            if action == 'analyze':
+                analyze_group.append((seq, (
+                    request['audioPath'], request['sessionId'], request['timestamp'],
+                    request.get('includeScores', True)
+                )))
+                continue
+
+            if analyze_group:
+                flush_analyze_group()
+
             if action == 'init':
                 analyzer.initialize(request['config'])
                 response = {'status': 'initialized'}
 
-            elif action == 'analyze':
-                audio_path = request['audioPath']
-                session_id = request['sessionId']
-                timestamp = request['timestamp']
-
-                result = analyzer.analyze_audio(audio_path, session_id, timestamp)
-                response = {'result': result, 'sessionId': session_id, 'timestamp': timestamp}
-
             else:
                 response = {'error': f'Unknown action: {action}'}
 
-            print(json.dumps(response))
-            sys.stdout.flush()
-
         except Exception as e:
-            error_response = {'error': str(e)}
-            print(json.dumps(error_response))
-            sys.stdout.flush()
+            response = {'error': str(e)}
+
+        responses.append((seq, response))
+
+    if analyze_group:
+        flush_analyze_group()
+
+    responses.sort(key=lambda item: item[0])
+    return responses
+
+def main():
+    analyzer = AudioEmotionAnalyzer()
+
+    # Requests and responses are msgpack payloads, each prefixed with its length
+    packer = msgpack.Packer(default=_encode_numpy)
+    out = sys.stdout.buffer
+
+    # Signal ready
+    write_frame(out, packer.pack('READY'))
+    out.flush()
+
+    # Read stdin on a background thread so requests can be batched
+    pending = queue.Queue()
+    threading.Thread(target=read_requests, args=(sys.stdin.buffer, pending), daemon=True).start()
+
+    # Extract features on the other cores while inference stays in this process
+    workers = min(MAX_BATCH, (os.cpu_count() or 1) - 1)
+    if workers > 1:
+        analyzer.start_pool(workers)
+
+    # Process requests
+    unflushed = 0
+    try:
+        while True:
+            batch = next_batch(pending)
+            eof = batch[-1] is None
+            if eof:
+                batch.pop()
+
+            for _, response in process_batch(analyzer, batch):
+                write_frame(out, packer.pack(response))
+                unflushed += 1
+                if unflushed >= FLUSH_EVERY:
+                    out.flush()
+                    unflushed = 0
+
+            # Keep interactive latency low: flush whenever the input has drained
+            if unflushed and pending.empty():
+                out.flush()
+                unflushed = 0
+
+            if eof:
+                break
+    finally:
+        out.flush()
+        analyzer.shutdown_pool()
 
 if __name__ == '__main__':
     main()
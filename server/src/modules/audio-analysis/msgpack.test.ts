@@ -0,0 +1,72 @@
+// Unit tests for the MessagePack codec used by the Python analyzer IPC
+
+import { encode, decode } from './msgpack';
+
+describe('msgpack', () => {
+  it('decodes a response packed by Python msgpack', () => {
+    // msgpack.packb({...}) from audio_emotion_analyzer.py's dependency
+    const packed = Buffer.from(
+      '86a6726573756c7483a7656d6f74696f6ea76e65757472616caa636f6e666964656e6365cb3fe0000000000000' +
+        'a673636f72657392cb3fd0000000000000cbbff8000000000000a973657373696f6e4964a27331a974696d657374' +
+        '616d70cf0000018bcfe56800a16ed1ff38a26f6bc3a46e6f6e65c0',
+      'hex'
+    );
+
+    expect(decode(packed)).toEqual({
+      result: { emotion: 'neutral', confidence: 0.5, scores: [0.25, -1.5] },
+      sessionId: 's1',
+      timestamp: 1700000000000,
+      n: -200,
+      ok: true,
+      none: null,
+    });
+  });
+
+  it('round-trips every type width', () => {
+    const values = [
+      0, 127, 128, 255, 256, 65535, 65536, 4294967295, 4294967296, Number.MAX_SAFE_INTEGER,
+      -1, -32, -33, -128, -129, -32768, -32769, -2147483648, -2147483649, Number.MIN_SAFE_INTEGER,
+      0.1, -2.5, 1e300, null, true, false,
+      '', 'a'.repeat(31), 'b'.repeat(32), 'c'.repeat(256), 'd'.repeat(65536), 'émotion ✓',
+      Array.from({ length: 15 }, (_, i) => i), Array.from({ length: 16 }, (_, i) => i),
+      Array.from({ length: 65536 }, () => 1),
+      Object.fromEntries(Array.from({ length: 16 }, (_, i) => [`k${i}`, i])),
+    ];
+
+    for (const value of values) {
+      expect(decode(encode(value))).toEqual(value);
+    }
+  });
+
+  it('round-trips binary data', () => {
+    const bytes = Buffer.from([0, 1, 2, 255]);
+    expect(Buffer.compare(decode(encode(bytes)) as Buffer, bytes)).toBe(0);
+  });
+
+  it('drops undefined properties only with ignoreUndefined', () => {
+    const message = { action: 'init', config: { modelType: undefined, sampleRate: 16000 } };
+
+    expect(decode(encode(message, { ignoreUndefined: true }))).toEqual({
+      action: 'init',
+      config: { sampleRate: 16000 },
+    });
+    expect(decode(encode(message))).toEqual({
+      action: 'init',
+      config: { modelType: null, sampleRate: 16000 },
+    });
+  });
+
+  it('keeps a __proto__ key as an own property', () => {
+    const decoded = decode(Buffer.from('81a95f5f70726f746f5f5f81a17801', 'hex')) as Record<string, unknown>;
+
+    expect(Object.prototype.hasOwnProperty.call(decoded, '__proto__')).toBe(true);
+    expect(Object.getPrototypeOf(decoded)).toBe(Object.prototype);
+  });
+
+  it('rejects truncated and trailing bytes', () => {
+    const packed = encode({ sessionId: 's1' });
+
+    expect(() => decode(packed.subarray(0, packed.length - 1))).toThrow(RangeError);
+    expect(() => decode(Buffer.concat([packed, Buffer.from([0xc0])]))).toThrow(RangeError);
+  });
+});
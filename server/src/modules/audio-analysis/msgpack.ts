@@ -0,0 +1,365 @@
+/**
+ * MessagePack Codec
+ *
+ * Minimal MessagePack encoder/decoder for the Python analyzer IPC
+ * Covers nil, booleans, integers, floats, strings, binary, arrays and maps (no extension types)
+ */
+
+export interface EncodeOptions {
+  // Omit object properties whose value is undefined, as JSON.stringify does
+  ignoreUndefined?: boolean;
+}
+
+/**
+ * Growable big-endian output buffer
+ */
+class Writer {
+  private buffer = Buffer.allocUnsafe(256);
+  private length = 0;
+
+  private reserve(size: number): number {
+    if (this.length + size > this.buffer.length) {
+      const next = Buffer.allocUnsafe(Math.max(this.buffer.length * 2, this.length + size));
+      this.buffer.copy(next, 0, 0, this.length);
+      this.buffer = next;
+    }
+
+    const offset = this.length;
+    this.length += size;
+    return offset;
+  }
+
+  u8(value: number): void {
+    const offset = this.reserve(1);
+    this.buffer.writeUInt8(value, offset);
+  }
+
+  u16(value: number): void {
+    const offset = this.reserve(2);
+    this.buffer.writeUInt16BE(value, offset);
+  }
+
+  u32(value: number): void {
+    const offset = this.reserve(4);
+    this.buffer.writeUInt32BE(value, offset);
+  }
+
+  u64(value: bigint): void {
+    const offset = this.reserve(8);
+    this.buffer.writeBigUInt64BE(value, offset);
+  }
+
+  i8(value: number): void {
+    const offset = this.reserve(1);
+    this.buffer.writeInt8(value, offset);
+  }
+
+  i16(value: number): void {
+    const offset = this.reserve(2);
+    this.buffer.writeInt16BE(value, offset);
+  }
+
+  i32(value: number): void {
+    const offset = this.reserve(4);
+    this.buffer.writeInt32BE(value, offset);
+  }
+
+  i64(value: bigint): void {
+    const offset = this.reserve(8);
+    this.buffer.writeBigInt64BE(value, offset);
+  }
+
+  f64(value: number): void {
+    const offset = this.reserve(8);
+    this.buffer.writeDoubleBE(value, offset);
+  }
+
+  bytes(value: Uint8Array): void {
+    const offset = this.reserve(value.length);
+    this.buffer.set(value, offset);
+  }
+
+  result(): Buffer {
+    return this.buffer.subarray(0, this.length);
+  }
+}
+
+function encodeInteger(writer: Writer, value: number): void {
+  if (value >= 0) {
+    if (value < 0x80) {
+      writer.u8(value);
+    } else if (value <= 0xff) {
+      writer.u8(0xcc);
+      writer.u8(value);
+    } else if (value <= 0xffff) {
+      writer.u8(0xcd);
+      writer.u16(value);
+    } else if (value <= 0xffffffff) {
+      writer.u8(0xce);
+      writer.u32(value);
+    } else {
+      writer.u8(0xcf);
+      writer.u64(BigInt(value));
+    }
+  } else if (value >= -0x20) {
+    writer.u8(value & 0xff);
+  } else if (value >= -0x80) {
+    writer.u8(0xd0);
+    writer.i8(value);
+  } else if (value >= -0x8000) {
+    writer.u8(0xd1);
+    writer.i16(value);
+  } else if (value >= -0x80000000) {
+    writer.u8(0xd2);
+    writer.i32(value);
+  } else {
+    writer.u8(0xd3);
+    writer.i64(BigInt(value));
+  }
+}
+
+// Header for a container of `length` items: fix form, then 16- and 32-bit lengths
+function encodeContainerHeader(writer: Writer, length: number, fix: number, type16: number): void {
+  if (length < 16) {
+    writer.u8(fix | length);
+  } else if (length <= 0xffff) {
+    writer.u8(type16);
+    writer.u16(length);
+  } else {
+    writer.u8(type16 + 1);
+    writer.u32(length);
+  }
+}
+
+// Header for `length` bytes of string or binary data: 8-, 16- and 32-bit lengths
+function encodeBytesHeader(writer: Writer, length: number, type8: number): void {
+  if (length <= 0xff) {
+    writer.u8(type8);
+    writer.u8(length);
+  } else if (length <= 0xffff) {
+    writer.u8(type8 + 1);
+    writer.u16(length);
+  } else {
+    writer.u8(type8 + 2);
+    writer.u32(length);
+  }
+}
+
+function encodeValue(writer: Writer, value: unknown, options: EncodeOptions): void {
+  if (value === null || value === undefined) {
+    writer.u8(0xc0);
+  } else if (typeof value === 'boolean') {
+    writer.u8(value ? 0xc3 : 0xc2);
+  } else if (typeof value === 'number') {
+    if (Number.isSafeInteger(value)) {
+      encodeInteger(writer, value);
+    } else {
+      writer.u8(0xcb);
+      writer.f64(value);
+    }
+  } else if (typeof value === 'string') {
+    const bytes = Buffer.from(value, 'utf8');
+    if (bytes.length < 32) {
+      writer.u8(0xa0 | bytes.length);
+    } else {
+      encodeBytesHeader(writer, bytes.length, 0xd9);
+    }
+    writer.bytes(bytes);
+  } else if (value instanceof Uint8Array) {
+    encodeBytesHeader(writer, value.length, 0xc4);
+    writer.bytes(value);
+  } else if (Array.isArray(value)) {
+    encodeContainerHeader(writer, value.length, 0x90, 0xdc);
+    value.forEach(item => encodeValue(writer, item, options));
+  } else if (typeof value === 'object') {
+    let entries = Object.entries(value as Record<string, unknown>);
+    if (options.ignoreUndefined) {
+      entries = entries.filter(([, item]) => item !== undefined);
+    }
+
+    encodeContainerHeader(writer, entries.length, 0x80, 0xde);
+    entries.forEach(([key, item]) => {
+      encodeValue(writer, key, options);
+      encodeValue(writer, item, options);
+    });
+  } else {
+    throw new TypeError(`Cannot encode ${typeof value} as MessagePack`);
+  }
+}
+
+/**
+ * Encode a value as MessagePack
+ */
+export function encode(value: unknown, options: EncodeOptions = {}): Buffer {
+  const writer = new Writer();
+  encodeValue(writer, value, options);
+  return writer.result();
+}
+
+/**
+ * Sequential reader over one MessagePack payload
+ */
+class Reader {
+  private offset = 0;
+
+  constructor(private readonly buffer: Buffer) {}
+
+  get done(): boolean {
+    return this.offset >= this.buffer.length;
+  }
+
+  private advance(size: number): number {
+    if (this.offset + size > this.buffer.length) {
+      throw new RangeError('Truncated MessagePack payload');
+    }
+
+    const offset = this.offset;
+    this.offset += size;
+    return offset;
+  }
+
+  u8(): number {
+    return this.buffer.readUInt8(this.advance(1));
+  }
+
+  u16(): number {
+    return this.buffer.readUInt16BE(this.advance(2));
+  }
+
+  u32(): number {
+    return this.buffer.readUInt32BE(this.advance(4));
+  }
+
+  u64(): number {
+    return Number(this.buffer.readBigUInt64BE(this.advance(8)));
+  }
+
+  i8(): number {
+    return this.buffer.readInt8(this.advance(1));
+  }
+
+  i16(): number {
+    return this.buffer.readInt16BE(this.advance(2));
+  }
+
+  i32(): number {
+    return this.buffer.readInt32BE(this.advance(4));
+  }
+
+  i64(): number {
+    return Number(this.buffer.readBigInt64BE(this.advance(8)));
+  }
+
+  f32(): number {
+    return this.buffer.readFloatBE(this.advance(4));
+  }
+
+  f64(): number {
+    return this.buffer.readDoubleBE(this.advance(8));
+  }
+
+  bytes(length: number): Buffer {
+    const offset = this.advance(length);
+    return this.buffer.subarray(offset, offset + length);
+  }
+}
+
+function decodeArray(reader: Reader, length: number): unknown[] {
+  const result: unknown[] = new Array(length);
+  for (let i = 0; i < length; i++) {
+    result[i] = decodeValue(reader);
+  }
+  return result;
+}
+
+function decodeMap(reader: Reader, length: number): Record<string, unknown> {
+  const result: Record<string, unknown> = {};
+  for (let i = 0; i < length; i++) {
+    const key = String(decodeValue(reader));
+    // Define rather than assign so a '__proto__' key stays an own property
+    Object.defineProperty(result, key, {
+      value: decodeValue(reader),
+      enumerable: true,
+      writable: true,
+      configurable: true,
+    });
+  }
+  return result;
+}
+
+function decodeValue(reader: Reader): unknown {
+  const type = reader.u8();
+
+  if (type < 0x80) return type;
+  if (type < 0x90) return decodeMap(reader, type & 0x0f);
+  if (type < 0xa0) return decodeArray(reader, type & 0x0f);
+  if (type < 0xc0) return reader.bytes(type & 0x1f).toString('utf8');
+  if (type >= 0xe0) return type - 0x100;
+
+  switch (type) {
+    case 0xc0:
+      return null;
+    case 0xc2:
+      return false;
+    case 0xc3:
+      return true;
+    case 0xc4:
+      return reader.bytes(reader.u8());
+    case 0xc5:
+      return reader.bytes(reader.u16());
+    case 0xc6:
+      return reader.bytes(reader.u32());
+    case 0xca:
+      return reader.f32();
+    case 0xcb:
+      return reader.f64();
+    case 0xcc:
+      return reader.u8();
+    case 0xcd:
+      return reader.u16();
+    case 0xce:
+      return reader.u32();
+    case 0xcf:
+      return reader.u64();
+    case 0xd0:
+      return reader.i8();
+    case 0xd1:
+      return reader.i16();
+    case 0xd2:
+      return reader.i32();
+    case 0xd3:
+      return reader.i64();
+    case 0xd9:
+      return reader.bytes(reader.u8()).toString('utf8');
+    case 0xda:
+      return reader.bytes(reader.u16()).toString('utf8');
+    case 0xdb:
+      return reader.bytes(reader.u32()).toString('utf8');
+    case 0xdc:
+      return decodeArray(reader, reader.u16());
+    case 0xdd:
+      return decodeArray(reader, reader.u32());
+    case 0xde:
+      return decodeMap(reader, reader.u16());
+    case 0xdf:
+      return decodeMap(reader, reader.u32());
+    default:
+      throw new TypeError(`Unsupported MessagePack type 0x${type.toString(16)}`);
+  }
+}
+
+/**
+ * Decode one MessagePack value that fills the whole payload
+ */
+export function decode(payload: Uint8Array): unknown {
+  const buffer = Buffer.isBuffer(payload)
+    ? payload
+    : Buffer.from(payload.buffer, payload.byteOffset, payload.byteLength);
+  const reader = new Reader(buffer);
+  const value = decodeValue(reader);
+
+  if (!reader.done) {
+    throw new RangeError('Trailing bytes after MessagePack value');
+  }
+  return value;
+}
@@ -0,0 +1,63 @@
+"""
+Audio Emotion Analyzer Tests
+Checks that the PyTorch batch pipeline stays in sync with compute_features
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_emotion_analyzer import AudioEmotionAnalyzer, TorchAudioPipeline  # noqa: E402
+
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), 'PyTorch not installed')
+class TorchAudioPipelineTest(unittest.TestCase):
+    """Runs the GPU pipeline on the CPU device and compares it with the NumPy path"""
+
+    def setUp(self):
+        import torch
+
+        self.analyzer = AudioEmotionAnalyzer()
+        self.pipeline = TorchAudioPipeline(self.analyzer, torch.device('cpu'))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_clip(self, name, y, sr):
+        path = os.path.join(self.tmpdir.name, f"{name}.wav")
+        sf.write(path, y, sr)
+        return path
+
+    def test_features_match_compute_features(self):
+        rng = np.random.default_rng(0)
+        t = np.arange(int(44100 * 2.0)) / 44100
+        tone = 0.3 * np.sin(2 * np.pi * 220.0 * t) + 0.05 * rng.standard_normal(t.shape)
+        stereo = 0.2 * rng.standard_normal((48000 * 4, 2))
+        short = 0.5 * np.sin(2 * np.pi * 440.0 * np.arange(4000) / 16000)
+
+        paths = [
+            self.write_clip('tone', tone, 44100),
+            self.write_clip('stereo', stereo, 48000),   # longer than max_duration
+            self.write_clip('short', short, 16000),
+            self.write_clip('silence', np.zeros(16000), 16000),
+            os.path.join(self.tmpdir.name, 'missing.wav'),
+        ]
+
+        features_list, _ = self.pipeline.analyze(paths)
+
+        for path, gpu in zip(paths, features_list):
+            with self.subTest(clip=os.path.basename(path)):
+                cpu = self.analyzer.extract_features(path, np.zeros(40, np.float32))
+                np.testing.assert_allclose(gpu['features'], cpu['features'], rtol=1e-3, atol=1e-3)
+                np.testing.assert_allclose(gpu['mfcc'], cpu['mfcc'], rtol=1e-3, atol=1e-3)
+                self.assertAlmostEqual(gpu['energy'], cpu['energy'], places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()